@@ -1,13 +1,102 @@
 from abc import ABC, abstractmethod
+from datetime import timedelta
 from typing import Optional
+from google.api_core import exceptions as google_exceptions
+from google.generativeai.client import get_default_generative_client
+from requests.adapters import HTTPAdapter
 import google.generativeai as genai
+import atexit
+import hashlib
+import json
+import logging
+import os
 import re
+import threading
 
 from models import ImageData, AnalysisResult, AIModelConfig
 from exceptions import AnalysisFailedException, ModelNotAvailableException
 
 
+logger = logging.getLogger('ai_ou_nao')
+
+_DIGITS_RE = re.compile(r'[0-9]+')
+
+_REST_POOL_SIZE = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 500))
+
+_MODEL_CACHE: dict = {}
+_GENAI_SETTINGS = None
+_GENAI_LOCK = threading.Lock()
+
+_PROMPT_CACHES: dict = {}
+_PROMPT_CACHE_CONTENTS: list = []
+_PROMPT_CACHES_LOCK = threading.Lock()
+
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "probability": {"type": "INTEGER"},
+        "analysis": {"type": "STRING"}
+    },
+    "required": ["probability", "analysis"]
+}
+
+
+def _configure_genai(api_key: str, transport: str):
+    global _GENAI_SETTINGS
+    settings = (api_key, transport)
+    if _GENAI_SETTINGS == settings:
+        return
+    
+    with _GENAI_LOCK:
+        if _GENAI_SETTINGS != settings:
+            genai.configure(api_key=api_key, transport=transport)
+            if transport == 'rest':
+                _widen_rest_pool()
+            _MODEL_CACHE.clear()
+            with _PROMPT_CACHES_LOCK:
+                _PROMPT_CACHES.clear()
+            _GENAI_SETTINGS = settings
+
+
+def _widen_rest_pool():
+    session = getattr(get_default_generative_client().transport, '_session', None)
+    if session is not None:
+        adapter = HTTPAdapter(pool_maxsize=_REST_POOL_SIZE)
+        session.mount('https://', adapter)
+
+
+def _schedule_prompt_cache_refresh(cached_content, ttl: int):
+    timer = threading.Timer(ttl * 0.8, _refresh_prompt_cache, args=(cached_content, ttl))
+    timer.daemon = True
+    timer.start()
+
+
+def _refresh_prompt_cache(cached_content, ttl: int):
+    try:
+        cached_content.update(ttl=timedelta(seconds=ttl))
+    except Exception as e:
+        logger.warning("Falha ao renovar cache de prompt do Gemini: %s", e)
+        return
+    _schedule_prompt_cache_refresh(cached_content, ttl)
+
+
+def _delete_prompt_caches():
+    with _PROMPT_CACHES_LOCK:
+        contents = list(_PROMPT_CACHE_CONTENTS)
+        _PROMPT_CACHE_CONTENTS.clear()
+    for cached_content in contents:
+        try:
+            cached_content.delete()
+        except Exception as e:
+            logger.warning("Falha ao remover cache de prompt do Gemini: %s", e)
+
+
+atexit.register(_delete_prompt_caches)
+
+
 class BaseAnalyzer(ABC):
+    _PROMPT_VERSION = ""
+    
     def __init__(self, config: AIModelConfig):
         self._config = config
         self._model = None
@@ -25,32 +114,48 @@ class BaseAnalyzer(ABC):
     def analyze(self, image_data: ImageData) -> AnalysisResult:
         pass
     
+    def validate(self, image_data: ImageData):
+        pass
+    
     def _extract_probability(self, response_text: str) -> int:
+        stripped = response_text.strip()
+        if stripped.isdecimal():
+            return min(100, int(stripped))
+        
+        match = _DIGITS_RE.search(response_text)
+        if match is None:
+            return 50
+        
+        probability = int(match.group())
+        return max(0, min(100, probability))
+    
+    def _parse_response(self, response_text: str) -> tuple:
         try:
-            probability = int(response_text.strip())
-            return max(0, min(100, probability))
-        except ValueError:
-            numbers = re.findall(r'\d+', response_text)
-            if numbers:
-                probability = int(numbers[0])
-                return max(0, min(100, probability))
-            else:
-                return 50
+            payload = json.loads(response_text)
+            probability = max(0, min(100, int(payload['probability'])))
+            analysis_text = str(payload.get('analysis') or '').strip()
+            return probability, analysis_text
+        except (ValueError, TypeError, KeyError, OverflowError):
+            return self._extract_probability(response_text), ''
+    
+    @property
+    def max_side(self) -> int:
+        return self._config.max_side
+    
+    @staticmethod
+    def _image_part(image_data: ImageData) -> dict:
+        return {"mime_type": "image/jpeg", "data": image_data.encode_jpeg()}
+    
+    @property
+    def cache_namespace(self) -> str:
+        return f"{self.__class__.__name__}:{self._config.model_name}:{self._config.max_side}:{self._PROMPT_VERSION}"
     
     def __str__(self):
         return f"{self.__class__.__name__}(model={self._config.model_name})"
 
 
 class GeminiAIDetector(BaseAnalyzer):
-    def _initialize_model(self):
-        try:
-            genai.configure(api_key=self._config.api_key)
-            self._model = genai.GenerativeModel(self._config.model_name)
-        except Exception as e:
-            raise ModelNotAvailableException(self._config.model_name)
-    
-    def _generate_prompt(self) -> str:
-        return """Analise cuidadosamente esta imagem e determine a probabilidade de ela ter sido gerada pelo GOOGLE GEMINI/IMAGEN (modelos de IA do Google).
+    _PROMPT = """Analise cuidadosamente esta imagem e determine a probabilidade de ela ter sido gerada pelo GOOGLE GEMINI/IMAGEN (modelos de IA do Google).
 
 FOCO ESPECIAL: Procure por SynthID - a marca d'água digital invisível do Google incorporada em imagens geradas por seus modelos de IA.
 
@@ -64,22 +169,107 @@ Indicadores-chave de imagens geradas pelo Google:
 
 ATENÇÃO: Diferencie de outros geradores de IA (DALL-E, Midjourney, Stable Diffusion).
 
-Responda APENAS com um número entre 0 e 100, onde:
-- 0 = certeza de que NÃO foi gerada pelo Google Gemini/Imagen
-- 100 = certeza de que FOI gerada pelo Google Gemini/Imagen
-- Valores intermediários = nível de confiança
-
-Forneça APENAS o número, sem explicações adicionais."""
+Responda APENAS com um objeto JSON no formato {"probability": <int>, "analysis": <string>}, onde:
+- "probability" é um número entre 0 e 100:
+  - 0 = certeza de que NÃO foi gerada pelo Google Gemini/Imagen
+  - 100 = certeza de que FOI gerada pelo Google Gemini/Imagen
+  - Valores intermediários = nível de confiança
+- "analysis" é uma breve análise (2-3 frases) explicando:
+  1. Se detectou ou não a presença de SynthID (marca d'água do Google)
+  2. Outros indicadores específicos do Gemini/Imagen que levaram a essa conclusão
+  3. Como diferenciou (se aplicável) de outros geradores de IA"""
+    _PROMPT_VERSION = hashlib.blake2b(_PROMPT.encode(), digest_size=4).hexdigest()
+    
+    _ANALYSIS_TEMPLATE = """Com base na probabilidade de {probability}% de esta imagem ter sido gerada pelo Google Gemini/Imagen, forneça uma breve análise (2-3 frases) explicando:
+1. Se detectou ou não a presença de SynthID (marca d'água do Google)
+2. Outros indicadores específicos do Gemini/Imagen que levaram a essa conclusão
+3. Como diferenciou (se aplicável) de outros geradores de IA"""
+    
+    _USER_TURN = "Analise esta imagem seguindo as instruções do sistema."
+    
+    def _initialize_model(self):
+        try:
+            _configure_genai(self._config.api_key, self._config.transport)
+            
+            model = _MODEL_CACHE.get(self._config.model_name)
+            if model is None:
+                model = _MODEL_CACHE.setdefault(
+                    self._config.model_name,
+                    genai.GenerativeModel(self._config.model_name)
+                )
+            self._model = model
+        except Exception as e:
+            raise ModelNotAvailableException(self._config.model_name)
+        
+        self._cached_model = self._get_prompt_cached_model()
+    
+    def _generate_prompt(self) -> str:
+        return self._PROMPT
+    
+    def _prompt_cache_key(self) -> tuple:
+        return (self._config.model_name, self.__class__.__name__)
+    
+    def _get_prompt_cached_model(self):
+        ttl = self._config.prompt_cache_ttl
+        if not ttl:
+            return None
+        
+        key = self._prompt_cache_key()
+        with _PROMPT_CACHES_LOCK:
+            if key not in _PROMPT_CACHES:
+                try:
+                    cached_content = genai.caching.CachedContent.create(
+                        model=self._config.model_name,
+                        system_instruction=self._generate_prompt(),
+                        ttl=timedelta(seconds=ttl)
+                    )
+                    _PROMPT_CACHE_CONTENTS.append(cached_content)
+                    _PROMPT_CACHES[key] = genai.GenerativeModel.from_cached_content(cached_content)
+                    _schedule_prompt_cache_refresh(cached_content, ttl)
+                except Exception as e:
+                    logger.warning("Cache de prompt do Gemini indisponível para %s: %s", self.__class__.__name__, e)
+                    _PROMPT_CACHES[key] = None
+            return _PROMPT_CACHES[key]
+    
+    def _invalidate_prompt_cache(self):
+        with _PROMPT_CACHES_LOCK:
+            _PROMPT_CACHES.pop(self._prompt_cache_key(), None)
+        self._cached_model = None
+    
+    def _generate_response(self, image_data: ImageData):
+        if self._cached_model is not None:
+            try:
+                return self._cached_model.generate_content(
+                    [self._USER_TURN, self._image_part(image_data)],
+                    generation_config=self._generation_config()
+                )
+            except google_exceptions.NotFound:
+                self._invalidate_prompt_cache()
+        
+        return self._model.generate_content(
+            [self._generate_prompt(), self._image_part(image_data)],
+            generation_config=self._generation_config()
+        )
+    
+    def _generation_config(self) -> dict:
+        generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": RESPONSE_SCHEMA,
+            "temperature": self._config.temperature
+        }
+        if self._config.max_tokens:
+            generation_config["max_output_tokens"] = self._config.max_tokens
+        return generation_config
     
     def analyze(self, image_data: ImageData) -> AnalysisResult:
         try:
-            prompt = self._generate_prompt()
-            response = self._model.generate_content([prompt, image_data.image])
-            probability = self._extract_probability(response.text)
+            response = self._generate_response(image_data)
+            probability, analysis_text = self._parse_response(response.text)
             
-            analysis_text = self._generate_detailed_analysis(image_data, probability)
+            if not analysis_text:
+                analysis_text = self._generate_detailed_analysis(image_data, probability)
             
-            return AnalysisResult(probability=probability, analysis_text=analysis_text)
+            return AnalysisResult.from_raw(probability=probability, analysis_text=analysis_text)
             
         except Exception as e:
             raise AnalysisFailedException(
@@ -89,22 +279,19 @@ Forneça APENAS o número, sem explicações adicionais."""
     
     def _generate_detailed_analysis(self, image_data: ImageData, probability: int) -> str:
         try:
-            analysis_prompt = f"""Com base na probabilidade de {probability}% de esta imagem ter sido gerada pelo Google Gemini/Imagen, forneça uma breve análise (2-3 frases) explicando:
-1. Se detectou ou não a presença de SynthID (marca d'água do Google)
-2. Outros indicadores específicos do Gemini/Imagen que levaram a essa conclusão
-3. Como diferenciou (se aplicável) de outros geradores de IA"""
+            analysis_prompt = self._ANALYSIS_TEMPLATE.format(probability=probability)
             
-            analysis_response = self._model.generate_content([analysis_prompt, image_data.image])
+            analysis_response = self._model.generate_content([analysis_prompt, self._image_part(image_data)])
             return analysis_response.text.strip()
         except Exception:
             return f"Análise indica {probability}% de probabilidade de ter sido gerada pelo Google Gemini/Imagen."
 
 
 class FastAIDetector(GeminiAIDetector):    
-    def _generate_prompt(self) -> str:
-        return """Análise rápida: Esta imagem foi gerada pelo Google Gemini/Imagen?
+    _PROMPT = """Análise rápida: Esta imagem foi gerada pelo Google Gemini/Imagen?
 Procure por SynthID (marca d'água do Google) e características visuais do Imagen.
-Responda APENAS com um número de 0 (NÃO é do Google) a 100 (É do Google)."""
+Responda APENAS com JSON: {"probability": <0 (NÃO é do Google) a 100 (É do Google)>, "analysis": "<uma frase curta justificando>"}."""
+    _PROMPT_VERSION = hashlib.blake2b(_PROMPT.encode(), digest_size=4).hexdigest()
     
     def _generate_detailed_analysis(self, image_data: ImageData, probability: int) -> str:
         if probability >= 70:
@@ -116,8 +303,7 @@ Responda APENAS com um número de 0 (NÃO é do Google) a 100 (É do Google)."""
 
 
 class DetailedAIDetector(GeminiAIDetector):
-    def _generate_prompt(self) -> str:
-        return """Realize uma análise PROFUNDA e ESPECIALIZADA para determinar se esta imagem foi gerada especificamente pelo GOOGLE GEMINI/IMAGEN.
+    _PROMPT = """Realize uma análise PROFUNDA e ESPECIALIZADA para determinar se esta imagem foi gerada especificamente pelo GOOGLE GEMINI/IMAGEN.
 
 PRIORIDADE MÁXIMA - Procure por:
 1. **SynthID**: Marca d'água imperceptível do Google (padrões específicos nos pixels)
@@ -136,10 +322,12 @@ DIFERENCIE de outros geradores:
 - Midjourney: estilo artístico dramático
 - Stable Diffusion: características open-source específicas
 
-Seja EXTREMAMENTE PRECISO. Responda com um número de 0 (NÃO é Google) a 100 (É Google)."""
+Seja EXTREMAMENTE PRECISO. Responda APENAS com um objeto JSON no formato {"probability": <int>, "analysis": <string>}, onde:
+- "probability" vai de 0 (NÃO é Google) a 100 (É Google)
+- "analysis" é uma análise (3-5 frases) citando a presença ou ausência de SynthID e os indicadores que sustentam a conclusão"""
+    _PROMPT_VERSION = hashlib.blake2b(_PROMPT.encode(), digest_size=4).hexdigest()
     
-    def analyze(self, image_data: ImageData) -> AnalysisResult:
-        if image_data.width < 100 or image_data.height < 100:
+    def validate(self, image_data: ImageData):
+        width, height = image_data.peek_size()
+        if width < 100 or height < 100:
             raise AnalysisFailedException("Imagem muito pequena para análise detalhada. Mínimo 100x100 pixels.")
-        
-        return super().analyze(image_data)
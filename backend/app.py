@@ -1,5 +1,12 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+from logging.handlers import QueueHandler, QueueListener
+import orjson
+import hashlib
+import atexit
+import logging
+import queue
 import os
 from dotenv import load_dotenv
 
@@ -8,100 +15,189 @@ from exceptions import AIDetectionException, APIKeyMissingException
 
 load_dotenv()
 
+log_queue = queue.SimpleQueue()
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+log_listener = QueueListener(log_queue, log_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+logging.root.addHandler(QueueHandler(log_queue))
+logging.root.setLevel(os.getenv('LOG_LEVEL', 'INFO'))
+logger = logging.getLogger('ai_ou_nao')
+
 app = Flask(__name__)
-CORS(app)
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 64 * 1024 * 1024))
+CORS(
+    app,
+    origins=[origin.strip() for origin in os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')],
+    methods=['GET', 'POST'],
+    max_age=86400
+)
 
 try:
     detection_service = AIDetectionService()
-    print(f"✅ Serviço inicializado: {detection_service}")
+    logger.info("✅ Serviço inicializado: %s", detection_service)
 except APIKeyMissingException as e:
-    print(f"⚠️  AVISO: {e.message}")
-    print("Por favor, crie um arquivo .env com sua chave da API do Gemini")
+    logger.warning("⚠️  AVISO: %s", e.message)
+    logger.warning("Por favor, crie um arquivo .env com sua chave da API do Gemini")
     detection_service = None
 
 
-@app.route('/api/health', methods=['GET'])
+def ojsonify(payload, status: int = 200) -> Response:
+    return app.response_class(orjson.dumps(payload), status=status, mimetype='application/json')
+
+
+_ANALYSIS_TYPES_JSON = orjson.dumps({
+    'types': [
+        {
+            'id': AIDetectionService.ANALYSIS_STANDARD,
+            'name': 'Análise Padrão',
+            'description': 'Análise balanceada entre velocidade e precisão'
+        },
+        {
+            'id': AIDetectionService.ANALYSIS_FAST,
+            'name': 'Análise Rápida',
+            'description': 'Análise mais rápida com menor precisão'
+        },
+        {
+            'id': AIDetectionService.ANALYSIS_DETAILED,
+            'name': 'Análise Detalhada',
+            'description': 'Análise mais profunda e precisa (mais lenta)'
+        }
+    ]
+})
+_ANALYSIS_TYPES_ETAG = hashlib.md5(_ANALYSIS_TYPES_JSON).hexdigest()
+_ANALYSIS_TYPES_MAX_AGE = 86400
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return ojsonify({
+        'error': 'Arquivo muito grande',
+        'success': False
+    }, 413)
+
+
+@app.route('/api/health', methods=['GET'], strict_slashes=False)
 def health():
     if detection_service and detection_service.is_configured:
-        return jsonify(detection_service.health_check())
+        return ojsonify(detection_service.health_check())
     else:
-        return jsonify({
+        return ojsonify({
             'status': 'error',
             'message': 'Serviço não configurado corretamente',
             'api_configured': False
-        }), 503
+        }, 503)
 
 
-@app.route('/api/analyze', methods=['POST'])
+def _resolve_analysis_type() -> str:
+    analysis_type = request.form.get('type', 'standard')
+    
+    valid_types = ['standard', 'fast', 'detailed']
+    if analysis_type not in valid_types:
+        analysis_type = 'standard'
+    
+    return analysis_type
+
+
+@app.route('/api/analyze', methods=['POST'], strict_slashes=False)
 def analyze_image():
+    request.max_content_length = AIDetectionService.MAX_UPLOAD_BYTES
+    
     if not detection_service or not detection_service.is_configured:
-        return jsonify({
+        return ojsonify({
             'error': 'Serviço de detecção não está configurado',
             'success': False
-        }), 503
+        }, 503)
     
     try:
         if 'image' not in request.files:
-            return jsonify({'error': 'Nenhuma imagem foi enviada', 'success': False}), 400
+            return ojsonify({'error': 'Nenhuma imagem foi enviada', 'success': False}, 400)
         
         image_file = request.files['image']
         
-        analysis_type = request.form.get('type', 'standard')
-        
-        valid_types = ['standard', 'fast', 'detailed']
-        if analysis_type not in valid_types:
-            analysis_type = 'standard'
+        analysis_type = _resolve_analysis_type()
         
         result = detection_service.analyze_image(image_file, analysis_type)
         
-        return jsonify(result.to_dict())
+        return ojsonify(result.to_dict())
+    
+    except RequestEntityTooLarge:
+        raise
     
     except AIDetectionException as e:
-        print(f"Erro de detecção: {e.message} (Código: {e.error_code})")
-        return jsonify(e.to_dict()), 400
+        logger.warning("Erro de detecção: %s (Código: %s)", e.message, e.error_code, extra={'error_code': e.error_code})
+        return ojsonify(e.to_dict(), 400)
     
     except Exception as e:
-        print(f"Erro inesperado: {str(e)}")
-        return jsonify({
+        logger.exception("Erro inesperado: %s", e)
+        return ojsonify({
             'error': f'Erro ao processar imagem: {str(e)}',
             'success': False
-        }), 500
+        }, 500)
 
 
-@app.route('/api/analysis-types', methods=['GET'])
+@app.route('/api/analyze_batch', methods=['POST'], strict_slashes=False)
+def analyze_batch():
+    if not detection_service or not detection_service.is_configured:
+        return ojsonify({
+            'error': 'Serviço de detecção não está configurado',
+            'success': False
+        }, 503)
+    
+    image_files = request.files.getlist('images')
+    if not image_files:
+        return ojsonify({'error': 'Nenhuma imagem foi enviada', 'success': False}, 400)
+    
+    analysis_type = _resolve_analysis_type()
+    
+    try:
+        outcomes = detection_service.analyze_batch(image_files, analysis_type)
+    except AIDetectionException as e:
+        logger.warning("Erro de detecção: %s (Código: %s)", e.message, e.error_code, extra={'error_code': e.error_code})
+        return ojsonify(e.to_dict(), 400)
+    
+    results = []
+    for image_file, outcome in zip(image_files, outcomes):
+        if isinstance(outcome, AIDetectionException):
+            logger.warning("Erro de detecção (%s): %s (Código: %s)", image_file.filename, outcome.message, outcome.error_code, extra={'error_code': outcome.error_code})
+            payload = outcome.to_dict()
+        elif isinstance(outcome, Exception):
+            logger.error("Erro inesperado (%s): %s", image_file.filename, outcome, exc_info=outcome)
+            payload = {'error': f'Erro ao processar imagem: {str(outcome)}', 'success': False}
+        else:
+            payload = outcome.to_dict()
+        results.append({'filename': image_file.filename, **payload})
+    
+    return ojsonify({'results': results, 'success': True})
+
+
+@app.route('/api/analysis-types', methods=['GET'], strict_slashes=False)
 def get_analysis_types():
-    return jsonify({
-        'types': [
-            {
-                'id': AIDetectionService.ANALYSIS_STANDARD,
-                'name': 'Análise Padrão',
-                'description': 'Análise balanceada entre velocidade e precisão'
-            },
-            {
-                'id': AIDetectionService.ANALYSIS_FAST,
-                'name': 'Análise Rápida',
-                'description': 'Análise mais rápida com menor precisão'
-            },
-            {
-                'id': AIDetectionService.ANALYSIS_DETAILED,
-                'name': 'Análise Detalhada',
-                'description': 'Análise mais profunda e precisa (mais lenta)'
-            }
-        ]
-    })
+    if request.if_none_match.contains_weak(_ANALYSIS_TYPES_ETAG):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(_ANALYSIS_TYPES_JSON, mimetype='application/json')
+    
+    response.set_etag(_ANALYSIS_TYPES_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = _ANALYSIS_TYPES_MAX_AGE
+    return response
 
 
 if __name__ == '__main__':
-    print("\n" + "="*60)
-    print("🤖 AI Detection Service - Backend POO")
-    print("="*60)
+    logger.info("="*60)
+    logger.info("🤖 AI Detection Service - Backend POO")
+    logger.info("="*60)
     
     if detection_service and detection_service.is_configured:
-        print(f"✅ Modelo: {detection_service.model_name}")
-        print("✅ Serviço pronto para uso!")
+        logger.info("✅ Modelo: %s", detection_service.model_name)
+        if not detection_service.has_libjpeg_turbo:
+            logger.warning("⚠️  Pillow sem libjpeg-turbo - decodificação de JPEG mais lenta")
+        logger.info("✅ Serviço pronto para uso!")
     else:
-        print("⚠️  Serviço não configurado - verifique a API key")
+        logger.warning("⚠️  Serviço não configurado - verifique a API key")
     
-    print("="*60 + "\n")
+    logger.info("="*60)
     
-    app.run(debug=True, port=5000)
+    app.run(debug=os.getenv('FLASK_DEBUG') == '1', port=5000)
@@ -0,0 +1,99 @@
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Optional
+from cachetools import TTLCache
+import orjson
+import threading
+
+from models import AnalysisResult
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+_HAS_IMAGEHASH = find_spec('imagehash') is not None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class AnalysisCache:
+    MAX_HAMMING_DISTANCE = 4
+    REDIS_KEY_PREFIX = "ai_ou_nao:analysis:"
+    REDIS_TTL = 86400
+
+    def __init__(self, maxsize: int = 1000, ttl: int = 3600, redis_url: Optional[str] = None):
+        self.__results = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.__perceptual_hashes = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.__lock = threading.Lock()
+        self.__redis = redis.Redis.from_url(redis_url, socket_timeout=0.5) if redis_url and redis is not None else None
+
+    @staticmethod
+    def make_key(image_digest: str, namespace: str) -> str:
+        return f"{image_digest}:{namespace}"
+
+    @staticmethod
+    def perceptual_hash(image: 'Image.Image'):
+        if not _HAS_IMAGEHASH:
+            return None
+        import imagehash
+        return imagehash.phash(image)
+
+    def get(self, key: str) -> Optional[AnalysisResult]:
+        with self.__lock:
+            result = self.__results.get(key)
+        if result is not None or self.__redis is None:
+            return result
+
+        result = self.__get_shared(key)
+        if result is not None:
+            with self.__lock:
+                self.__results[key] = result
+        return result
+
+    def __get_shared(self, key: str) -> Optional[AnalysisResult]:
+        try:
+            payload = self.__redis.get(self.REDIS_KEY_PREFIX + key)
+        except redis.RedisError:
+            return None
+        if payload is None:
+            return None
+        try:
+            data = orjson.loads(payload)
+            return AnalysisResult.from_raw(probability=int(data['probability']), analysis_text=str(data['analysis_text']))
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+            return None
+
+    def __set_shared(self, key: str, result: AnalysisResult):
+        payload = orjson.dumps({'probability': result.probability, 'analysis_text': result.analysis_text})
+        try:
+            self.__redis.set(self.REDIS_KEY_PREFIX + key, payload, ex=self.REDIS_TTL)
+        except redis.RedisError:
+            pass
+
+    def get_similar(self, phash, namespace: str) -> Optional[AnalysisResult]:
+        if phash is None:
+            return None
+
+        with self.__lock:
+            for key, (cached_namespace, cached_phash) in list(self.__perceptual_hashes.items()):
+                if cached_namespace == namespace and phash - cached_phash <= self.MAX_HAMMING_DISTANCE:
+                    result = self.__results.get(key)
+                    if result is not None:
+                        return result
+        return None
+
+    def set(self, key: str, result: AnalysisResult, namespace: str, phash=None):
+        with self.__lock:
+            self.__results[key] = result
+            if phash is not None:
+                self.__perceptual_hashes[key] = (namespace, phash)
+        if self.__redis is not None:
+            self.__set_shared(key, result)
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__results)
+
+    def __str__(self):
+        return f"AnalysisCache(entries={len(self)}, similarity={_HAS_IMAGEHASH}, shared={self.__redis is not None})"
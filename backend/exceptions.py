@@ -2,14 +2,15 @@ class AIDetectionException(Exception):
     def __init__(self, message: str, error_code: str = "UNKNOWN_ERROR"):
         self.message = message
         self.error_code = error_code
+        self._dict = {
+            'error': message,
+            'error_code': error_code,
+            'success': False
+        }
         super().__init__(self.message)
     
     def to_dict(self):
-        return {
-            'error': self.message,
-            'error_code': self.error_code,
-            'success': False
-        }
+        return self._dict
 
 
 class InvalidImageException(AIDetectionException):
@@ -39,3 +40,9 @@ class ModelNotAvailableException(AIDetectionException):
     def __init__(self, model_name: str):
         message = f"Modelo '{model_name}' não está disponível"
         super().__init__(message, "MODEL_NOT_AVAILABLE")
+
+
+class BatchTooLargeException(AIDetectionException):
+    def __init__(self, max_size: int):
+        message = f"Muitas imagens no lote. Máximo {max_size} por requisição."
+        super().__init__(message, "BATCH_TOO_LARGE")
@@ -1,103 +1,167 @@
-from PIL import Image
-from typing import Optional
-from dataclasses import dataclass
+from PIL import Image, UnidentifiedImageError
+from typing import BinaryIO, Optional
+from dataclasses import dataclass, field
 from io import BytesIO
+import hashlib
+import struct
 
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
 
+
+Image.MAX_IMAGE_PIXELS = 25_000_000
+Image.init()
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+
+_CLASSIFICATION_TABLE = tuple(
+    "Muito provável do Google Gemini" if p >= 80
+    else "Provavelmente do Google Gemini" if p >= 60
+    else "Incerto" if p >= 40
+    else "Provavelmente não é do Google" if p >= 20
+    else "Muito provável que não é do Google"
+    for p in range(101)
+)
+
+_CONFIDENCE_TABLE = tuple(
+    "Alta" if p >= 80 or p <= 20
+    else "Média" if p >= 60 or p <= 40
+    else "Baixa"
+    for p in range(101)
+)
+
+
+@dataclass(slots=True, eq=False)
 class ImageData:
-    def __init__(self, image: Image.Image, filename: str = "unknown"):
-        self.__image = image 
-        self.__filename = filename
-        self.__size = image.size
-        self.__format = image.format
-    
-    @property
-    def image(self) -> Image.Image:
-        return self.__image
-    
-    @property
-    def filename(self) -> str:
-        return self.__filename
-    
-    @property
-    def size(self) -> tuple:
-        return self.__size
-    
-    @property
-    def format(self) -> Optional[str]:
-        return self.__format
-    
-    @property
-    def width(self) -> int:
-        return self.__size[0]
+    source: BinaryIO
+    filename: str = "unknown"
+    max_side: Optional[int] = None
+    _opened: Optional[Image.Image] = field(default=None, init=False, repr=False)
+    _image: Optional[Image.Image] = field(default=None, init=False, repr=False)
+    _size: Optional[tuple] = field(default=None, init=False, repr=False)
+    _format: Optional[str] = field(default=None, init=False, repr=False)
+    _digest: Optional[str] = field(default=None, init=False, repr=False)
+    _jpeg: Optional[bytes] = field(default=None, init=False, repr=False)
+    
+    HASH_CHUNK_SIZE = 64 * 1024
+    
+    def __open(self) -> Image.Image:
+        if self._opened is None:
+            try:
+                self.source.seek(0)
+                self._opened = Image.open(self.source, formats=_ALLOWED_FORMATS)
+            except (UnidentifiedImageError, IOError, OSError, Image.DecompressionBombError) as e:
+                from exceptions import InvalidImageException
+                raise InvalidImageException(f"Não foi possível abrir a imagem: {str(e)}")
+            self._size = self._opened.size
+            self._format = self._opened.format
+        return self._opened
+    
+    def __decode(self) -> Image.Image:
+        image = self.__open()
+        self._opened = None
+        try:
+            if self.max_side:
+                bounds = (self.max_side, self.max_side)
+                image.draft('RGB', bounds)
+                image.thumbnail(bounds, Image.Resampling.LANCZOS)
+            else:
+                image.load()
+            
+            return image
+        except (IOError, OSError, Image.DecompressionBombError) as e:
+            from exceptions import InvalidImageException
+            raise InvalidImageException(f"Não foi possível abrir a imagem: {str(e)}")
+    
+    def __read_header(self, length: int) -> bytes:
+        self.source.seek(0)
+        header = self.source.read(length)
+        self.source.seek(0)
+        return header
+    
+    def peek_size(self) -> tuple:
+        if self._size is None:
+            header = self.__read_header(24)
+            if header[:8] == _PNG_SIGNATURE and header[12:16] == b'IHDR' and len(header) == 24:
+                self._size = struct.unpack_from('>II', header, 16)
+                self._format = 'PNG'
+            else:
+                self.__open()
+        return self._size
     
     @property
-    def height(self) -> int:
-        return self.__size[1]
+    def digest(self) -> str:
+        if self._digest is None:
+            hasher = blake3() if blake3 is not None else hashlib.blake2b(digest_size=16)
+            self.source.seek(0)
+            for chunk in iter(lambda: self.source.read(self.HASH_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+            self.source.seek(0)
+            self._digest = hasher.hexdigest(16) if blake3 is not None else hasher.hexdigest()
+        return self._digest
+    
+    def load(self) -> Image.Image:
+        if self._image is None:
+            self._image = self.__decode()
+        return self._image
+    
+    def encode_jpeg(self, quality: int = 85) -> bytes:
+        if self._jpeg is None:
+            image = self.load()
+            if self._format == 'JPEG' and image.size == self._size:
+                self.source.seek(0)
+                self._jpeg = self.source.read()
+                self.source.seek(0)
+            else:
+                if image.mode != 'RGB':
+                    image = image.convert('RGB')
+                buffer = BytesIO()
+                image.save(buffer, format='JPEG', quality=quality)
+                self._jpeg = buffer.getvalue()
+        return self._jpeg
     
     def __str__(self):
-        return f"ImageData(filename={self.filename}, size={self.size}, format={self.format})"
+        return f"ImageData(filename={self.filename}, size={self._size}, format={self._format})"
     
     def __repr__(self):
         return self.__str__()
 
 
+@dataclass(frozen=True, slots=True)
 class AnalysisResult:
-    def __init__(self, probability: int, analysis_text: str):
-        self.__probability = self.__validate_probability(probability)
-        self.__analysis_text = analysis_text
-        self.__classification = self.__determine_classification()
-    
-    @staticmethod
-    def __validate_probability(probability: int) -> int:
-        return max(0, min(100, probability))
-    
-    def __determine_classification(self) -> str:
-        if self.__probability >= 80:
-            return "Muito provável do Google Gemini"
-        elif self.__probability >= 60:
-            return "Provavelmente do Google Gemini"
-        elif self.__probability >= 40:
-            return "Incerto"
-        elif self.__probability >= 20:
-            return "Provavelmente não é do Google"
-        else:
-            return "Muito provável que não é do Google"
+    probability: int
+    analysis_text: str
+    classification: str
+    is_likely_ai: bool
+    confidence_level: str
+    _dict: dict = field(init=False, repr=False, compare=False)
     
-    @property
-    def probability(self) -> int:
-        return self.__probability
-    
-    @property
-    def analysis_text(self) -> str:
-        return self.__analysis_text
-    
-    @property
-    def classification(self) -> str:
-        return self.__classification
-    
-    @property
-    def is_likely_ai(self) -> bool:
-        return self.__probability >= 60
-    
-    @property
-    def confidence_level(self) -> str:
-        if self.__probability >= 80 or self.__probability <= 20:
-            return "Alta"
-        elif self.__probability >= 60 or self.__probability <= 40:
-            return "Média"
-        else:
-            return "Baixa"
-    
-    def to_dict(self) -> dict:
-        return {
-            'probability': self.__probability,
-            'classification': self.__classification,
-            'analysis': self.__analysis_text,
+    def __post_init__(self):
+        object.__setattr__(self, '_dict', {
+            'probability': self.probability,
+            'classification': self.classification,
+            'analysis': self.analysis_text,
             'is_likely_ai': self.is_likely_ai,
             'confidence_level': self.confidence_level,
             'success': True
-        }
+        })
+    
+    @classmethod
+    def from_raw(cls, probability: int, analysis_text: str) -> 'AnalysisResult':
+        probability = 0 if probability < 0 else 100 if probability > 100 else probability
+        return cls(
+            probability=probability,
+            analysis_text=analysis_text,
+            classification=_CLASSIFICATION_TABLE[probability],
+            is_likely_ai=probability >= 60,
+            confidence_level=_CONFIDENCE_TABLE[probability]
+        )
+    
+    def to_dict(self) -> dict:
+        return self._dict
     
     def __str__(self):
         return f"AnalysisResult(probability={self.probability}%, classification='{self.classification}')"
@@ -106,12 +170,15 @@ class AnalysisResult:
         return self.__str__()
 
 
-@dataclass
+@dataclass(slots=True)
 class AIModelConfig:
     model_name: str
     api_key: str
-    temperature: float = 0.4
+    temperature: float = 0.0
     max_tokens: Optional[int] = None
+    prompt_cache_ttl: int = 0
+    transport: str = "grpc"
+    max_side: int = 1024
     
     def __post_init__(self):
         if not self.api_key:
@@ -120,3 +187,6 @@ class AIModelConfig:
         
         if self.temperature < 0 or self.temperature > 1:
             raise ValueError("Temperature deve estar entre 0 e 1")
+        
+        if self.transport not in ("grpc", "rest"):
+            raise ValueError("Transport deve ser 'grpc' ou 'rest'")
@@ -1,28 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from typing import Optional
-from PIL import Image
 from io import BytesIO
 import os
 
+from cache import AnalysisCache
 from models import ImageData, AnalysisResult, AIModelConfig
 from analyzers import BaseAnalyzer, GeminiAIDetector, FastAIDetector, DetailedAIDetector
 from exceptions import (
     InvalidImageException,
     NoImageProvidedException,
     APIKeyMissingException,
-    AnalysisFailedException
+    AnalysisFailedException,
+    BatchTooLargeException
 )
 
+try:
+    from gevent import get_hub, monkey
+    from gevent.pool import Pool
+except ImportError:
+    monkey = None
+
+
+def _gevent_patched() -> bool:
+    return monkey is not None and monkey.is_module_patched('socket')
+
+
+def _run_off_hub(func, *args):
+    if not _gevent_patched():
+        return func(*args)
+    
+    def call():
+        try:
+            return func(*args), None
+        except Exception as e:
+            return None, e
+    
+    result, error = get_hub().threadpool.apply(call)
+    if error is not None:
+        raise error
+    return result
+
+
+def _is_seekable(stream) -> bool:
+    try:
+        return stream.seekable()
+    except AttributeError:
+        return hasattr(stream, 'seek')
+
 
 class AIDetectionService:
     ANALYSIS_STANDARD = "standard"
     ANALYSIS_FAST = "fast"
     ANALYSIS_DETAILED = "detailed"
+    DETAILED_MAX_IMAGE_SIDE = 1600
+    MAX_CONCURRENT_ANALYSES = 8
+    MAX_BATCH_SIZE = 20
+    MAX_UPLOAD_BYTES = 15 * 1024 * 1024
+    ALLOWED_MAGIC = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'RIFF', b'GIF8')
     
     def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-2.5-flash"):
         self.__api_key = api_key or os.getenv('GEMINI_API_KEY')
         self.__model_name = model_name
         self.__config = None
         self.__analyzer = None
+        self.__analyzers = {}
+        self.__health = {}
+        self.__cache = AnalysisCache(redis_url=os.getenv('REDIS_URL'))
         
         self._validate_and_configure()
     
@@ -32,60 +76,126 @@ class AIDetectionService:
         
         self.__config = AIModelConfig(
             model_name=self.__model_name,
-            api_key=self.__api_key
+            api_key=self.__api_key,
+            prompt_cache_ttl=int(os.getenv('GEMINI_PROMPT_CACHE_TTL', 0)),
+            transport=os.getenv('GEMINI_TRANSPORT') or ('rest' if _gevent_patched() else 'grpc')
         )
         
-        self.__analyzer = GeminiAIDetector(self.__config)
+        self.__analyzers = {
+            self.ANALYSIS_STANDARD: GeminiAIDetector(self.__config),
+            self.ANALYSIS_FAST: FastAIDetector(self.__config),
+            self.ANALYSIS_DETAILED: DetailedAIDetector(replace(self.__config, max_side=self.DETAILED_MAX_IMAGE_SIDE))
+        }
+        self.__analyzer = self.__analyzers[self.ANALYSIS_STANDARD]
+        
+        self.__health = {
+            'status': 'ok',
+            'service': 'AI Detection Service',
+            'model': self.__model_name,
+            'api_configured': True,
+            'analyzer': str(self.__analyzer),
+            'libjpeg_turbo': self.has_libjpeg_turbo
+        }
     
-    def _create_image_data(self, image_file) -> ImageData:
-        try:
-            if not image_file or not hasattr(image_file, 'read'):
-                raise NoImageProvidedException()
-            
-            image_bytes = image_file.read()
-            if not image_bytes:
-                raise InvalidImageException("Arquivo de imagem vazio")
-            
-            image = Image.open(BytesIO(image_bytes))
-            
-            filename = getattr(image_file, 'filename', 'unknown')
-            
-            return ImageData(image=image, filename=filename)
-            
-        except (IOError, OSError) as e:
-            raise InvalidImageException(f"Não foi possível abrir a imagem: {str(e)}")
+    def _read_image_data(self, image_file, max_side: int) -> ImageData:
+        if not image_file or not hasattr(image_file, 'read'):
+            raise NoImageProvidedException()
+        
+        content_length = getattr(image_file, 'content_length', 0)
+        if content_length and content_length > self.MAX_UPLOAD_BYTES:
+            raise InvalidImageException(self.__too_large_message())
+        
+        stream = getattr(image_file, 'stream', image_file)
+        if not _is_seekable(stream):
+            stream = BytesIO(stream.read(self.MAX_UPLOAD_BYTES + 1))
+        
+        stream.seek(0, os.SEEK_END)
+        length = stream.tell()
+        if length == 0:
+            raise InvalidImageException("Arquivo de imagem vazio")
+        if length > self.MAX_UPLOAD_BYTES:
+            raise InvalidImageException(self.__too_large_message())
+        
+        stream.seek(0)
+        header = stream.read(16)
+        stream.seek(0)
+        if not header.startswith(self.ALLOWED_MAGIC):
+            raise InvalidImageException("Formato de imagem não suportado. Use JPEG, PNG, WEBP ou GIF.")
+        
+        filename = getattr(image_file, 'filename', 'unknown')
+        
+        return ImageData(source=stream, filename=filename, max_side=max_side)
+    
+    def __too_large_message(self) -> str:
+        return f"Imagem muito grande. Máximo {self.MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
     
     def _select_analyzer(self, analysis_type: str) -> BaseAnalyzer:
-        if analysis_type == self.ANALYSIS_FAST:
-            return FastAIDetector(self.__config)
-        elif analysis_type == self.ANALYSIS_DETAILED:
-            return DetailedAIDetector(self.__config)
-        else:
-            return GeminiAIDetector(self.__config)
+        return self.__analyzers.get(analysis_type, self.__analyzer)
     
-    def analyze_image(self, image_file, analysis_type: str = ANALYSIS_STANDARD) -> AnalysisResult:
+    def _validate_upload(self, image_file):
         if not image_file:
             raise NoImageProvidedException()
         
         if hasattr(image_file, 'filename') and not image_file.filename:
             raise NoImageProvidedException("Nenhuma imagem selecionada")
+    
+    def _prepare_analysis(self, image_data: ImageData, analyzer: BaseAnalyzer) -> tuple:
+        analyzer.validate(image_data)
+        
+        namespace = analyzer.cache_namespace
+        cache_key = self.__cache.make_key(image_data.digest, namespace)
+        cached_result = self.__cache.get(cache_key)
+        if cached_result is not None:
+            return cache_key, cached_result, None
         
-        image_data = self._create_image_data(image_file)
+        image = _run_off_hub(image_data.load)
+        phash = self.__cache.perceptual_hash(image)
+        cached_result = self.__cache.get_similar(phash, namespace)
+        if cached_result is not None:
+            self.__cache.set(cache_key, cached_result, namespace)
+        
+        return cache_key, cached_result, phash
+    
+    def analyze_image(self, image_file, analysis_type: str = ANALYSIS_STANDARD) -> AnalysisResult:
+        self._validate_upload(image_file)
         
         analyzer = self._select_analyzer(analysis_type)
         
+        image_data = self._read_image_data(image_file, analyzer.max_side)
+        
+        cache_key, cached_result, phash = self._prepare_analysis(image_data, analyzer)
+        if cached_result is not None:
+            return cached_result
+        
         result = analyzer.analyze(image_data)
         
+        self.__cache.set(cache_key, result, analyzer.cache_namespace, phash)
+        
         return result
     
+    def analyze_batch(self, image_files: list, analysis_type: str = ANALYSIS_STANDARD) -> list:
+        if len(image_files) > self.MAX_BATCH_SIZE:
+            raise BatchTooLargeException(self.MAX_BATCH_SIZE)
+        
+        def analyze_one(image_file):
+            try:
+                return self.analyze_image(image_file, analysis_type)
+            except Exception as e:
+                return e
+        
+        if _gevent_patched():
+            return Pool(self.MAX_CONCURRENT_ANALYSES).map(analyze_one, image_files)
+        
+        with ThreadPoolExecutor(max_workers=min(self.MAX_CONCURRENT_ANALYSES, len(image_files))) as executor:
+            return list(executor.map(analyze_one, image_files))
+    
     def health_check(self) -> dict:
-        return {
-            'status': 'ok',
-            'service': 'AI Detection Service',
-            'model': self.__model_name,
-            'api_configured': bool(self.__api_key),
-            'analyzer': str(self.__analyzer)
-        }
+        return {**self.__health, 'cache': str(self.__cache)}
+    
+    @property
+    def has_libjpeg_turbo(self) -> bool:
+        from PIL import features
+        return bool(features.check_feature('libjpeg_turbo'))
     
     @property
     def model_name(self) -> str:
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+from io import BytesIO
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ['GEMINI_API_KEY'] = 'fake'
+os.environ.pop('REDIS_URL', None)
+os.environ.pop('GEMINI_PROMPT_CACHE_TTL', None)
+
+import google.generativeai as genai
+from PIL import Image
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    calls = []
+    response_text = json.dumps({'probability': 70, 'analysis': 'ok'})
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, **kwargs):
+        FakeModel.calls.append((self.model_name, contents[0]))
+        return FakeResponse(FakeModel.response_text)
+
+    @classmethod
+    def reset(cls, response_text=None):
+        cls.calls = []
+        cls.response_text = response_text or json.dumps({'probability': 70, 'analysis': 'ok'})
+
+
+class FakeRedisError(Exception):
+    pass
+
+
+class FakeRedis:
+    def __init__(self, store: dict):
+        self.store = store
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+class FakeRedisModule:
+    RedisError = FakeRedisError
+
+    def __init__(self):
+        self.store = {}
+        self.Redis = self
+
+    def from_url(self, url, **kwargs):
+        return FakeRedis(self.store)
+
+
+genai.GenerativeModel = FakeModel
+genai.configure = lambda **kwargs: None
+
+
+class FakeUpload:
+    def __init__(self, data: bytes, filename: str = 'image.jpg'):
+        self.stream = BytesIO(data)
+        self.filename = filename
+        self.content_length = 0
+
+    def read(self, *args):
+        return self.stream.read(*args)
+
+
+def image_bytes(size=(400, 300), fmt='JPEG', color=(10, 20, 30)) -> bytes:
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, fmt)
+    return buffer.getvalue()
@@ -0,0 +1,41 @@
+import unittest
+
+import fakes
+
+import app as app_module
+
+
+class AnalysisTypesCachingTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app_module.app.test_client()
+        self.etag = self.client.get('/api/analysis-types').headers['ETag']
+
+    def get(self, if_none_match: str):
+        return self.client.get('/api/analysis-types', headers={'If-None-Match': if_none_match})
+
+    def test_full_response_carries_caching_headers(self):
+        response = self.client.get('/api/analysis-types')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['types']), 3)
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=86400')
+
+    def test_strong_etag_is_not_modified(self):
+        response = self.get(self.etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], self.etag)
+
+    def test_weak_etag_is_not_modified(self):
+        self.assertEqual(self.get(f'W/{self.etag}').status_code, 304)
+
+    def test_wildcard_is_not_modified(self):
+        self.assertEqual(self.get('*').status_code, 304)
+
+    def test_other_etag_gets_full_response(self):
+        self.assertEqual(self.get('"outro"').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
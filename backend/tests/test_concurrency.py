@@ -0,0 +1,130 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GEMINI_DELAY = 0.5
+CONCURRENT_REQUESTS = 20
+
+_SCRIPT = """
+import sys
+if sys.argv[1] == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+import json
+import os
+import time
+from io import BytesIO
+
+os.environ['GEMINI_API_KEY'] = 'fake'
+os.environ.pop('REDIS_URL', None)
+
+import google.generativeai as genai
+from PIL import Image
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, model_name=None, **kwargs):
+        pass
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(float(sys.argv[3]))
+        return FakeResponse(json.dumps({'probability': 70, 'analysis': 'ok'}))
+
+
+genai.GenerativeModel = FakeModel
+genai.configure = lambda **kwargs: None
+
+import app as app_module
+
+client = app_module.app.test_client()
+count = int(sys.argv[2])
+
+
+def image_bytes(index):
+    buffer = BytesIO()
+    Image.new('RGB', (200, 200), (index, 0, 0)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def analyze(index):
+    response = client.post(
+        '/api/analyze',
+        data={'image': (BytesIO(image_bytes(index)), f'{index}.jpg')},
+        content_type='multipart/form-data'
+    )
+    return response.status_code
+
+
+def analyze_batch():
+    response = client.post(
+        '/api/analyze_batch',
+        data={'images': [(BytesIO(image_bytes(100 + index)), f'{index}.jpg') for index in range(8)]},
+        content_type='multipart/form-data'
+    )
+    return response.status_code, [item['success'] for item in response.get_json()['results']]
+
+
+start = time.monotonic()
+if sys.argv[1] == 'gevent':
+    from gevent.pool import Pool
+    statuses = Pool(count).map(analyze, range(count))
+else:
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        statuses = list(executor.map(analyze, range(count)))
+single_elapsed = time.monotonic() - start
+
+start = time.monotonic()
+batch_status, batch_results = analyze_batch()
+batch_elapsed = time.monotonic() - start
+
+print(json.dumps({
+    'statuses': statuses,
+    'single_elapsed': single_elapsed,
+    'batch_status': batch_status,
+    'batch_results': batch_results,
+    'batch_elapsed': batch_elapsed
+}))
+"""
+
+
+class ConcurrentRequestsTest(unittest.TestCase):
+    def run_app(self, mode: str) -> dict:
+        completed = subprocess.run(
+            [sys.executable, '-c', _SCRIPT, mode, str(CONCURRENT_REQUESTS), str(GEMINI_DELAY)],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            timeout=60
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def assert_concurrent(self, outcome: dict):
+        self.assertEqual(outcome['statuses'], [200] * CONCURRENT_REQUESTS)
+        self.assertLess(outcome['single_elapsed'], GEMINI_DELAY * CONCURRENT_REQUESTS / 2)
+
+        self.assertEqual(outcome['batch_status'], 200)
+        self.assertEqual(outcome['batch_results'], [True] * 8)
+        self.assertLess(outcome['batch_elapsed'], GEMINI_DELAY * 8 / 2)
+
+    def test_gevent_workers(self):
+        self.assert_concurrent(self.run_app('gevent'))
+
+    def test_threads(self):
+        self.assert_concurrent(self.run_app('threads'))
+
+
+if __name__ == '__main__':
+    unittest.main()
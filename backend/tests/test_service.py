@@ -0,0 +1,209 @@
+import json
+import os
+import unittest
+from importlib.util import find_spec
+from io import BytesIO
+from unittest import mock
+
+from fakes import FakeModel, FakeRedisModule, FakeUpload, image_bytes
+
+import cache
+from analyzers import GeminiAIDetector
+from exceptions import AnalysisFailedException, BatchTooLargeException, InvalidImageException
+from models import ImageData
+from services import AIDetectionService
+
+
+class AnalysisCacheTest(unittest.TestCase):
+    def setUp(self):
+        FakeModel.reset()
+        self.service = AIDetectionService()
+
+    def test_same_image_is_served_from_cache(self):
+        data = image_bytes()
+
+        first = self.service.analyze_image(FakeUpload(data))
+        second = self.service.analyze_image(FakeUpload(data))
+
+        self.assertEqual(len(FakeModel.calls), 1)
+        self.assertEqual(first.to_dict(), second.to_dict())
+
+    def test_analysis_types_do_not_share_entries(self):
+        data = image_bytes()
+
+        self.service.analyze_image(FakeUpload(data), AIDetectionService.ANALYSIS_STANDARD)
+        self.service.analyze_image(FakeUpload(data), AIDetectionService.ANALYSIS_FAST)
+
+        self.assertEqual(len(FakeModel.calls), 2)
+
+    def test_prompt_change_invalidates_entries(self):
+        data = image_bytes()
+
+        self.service.analyze_image(FakeUpload(data))
+        with mock.patch.object(GeminiAIDetector, '_PROMPT_VERSION', 'changed'):
+            self.service.analyze_image(FakeUpload(data))
+
+        self.assertEqual(len(FakeModel.calls), 2)
+
+    @unittest.skipUnless(find_spec('imagehash'), "imagehash não instalado")
+    def test_recompressed_image_is_served_from_cache(self):
+        from PIL import Image
+
+        gradient = Image.linear_gradient('L').resize((400, 400)).convert('RGB')
+        original, recompressed = BytesIO(), BytesIO()
+        gradient.save(original, 'JPEG', quality=95)
+        gradient.save(recompressed, 'JPEG', quality=60)
+        self.assertNotEqual(original.getvalue(), recompressed.getvalue())
+
+        self.service.analyze_image(FakeUpload(original.getvalue()))
+        self.service.analyze_image(FakeUpload(recompressed.getvalue()))
+
+        self.assertEqual(len(FakeModel.calls), 1)
+
+
+class SharedCacheTest(unittest.TestCase):
+    def setUp(self):
+        FakeModel.reset()
+        self.redis = FakeRedisModule()
+        patches = [
+            mock.patch.object(cache, 'redis', self.redis),
+            mock.patch.dict(os.environ, {'REDIS_URL': 'redis://fake'})
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_entries_are_shared_between_services(self):
+        data = image_bytes()
+
+        AIDetectionService().analyze_image(FakeUpload(data))
+        AIDetectionService().analyze_image(FakeUpload(data))
+
+        self.assertEqual(len(FakeModel.calls), 1)
+
+    def test_entries_are_not_shared_between_models(self):
+        data = image_bytes()
+
+        AIDetectionService().analyze_image(FakeUpload(data))
+        AIDetectionService(model_name='gemini-other').analyze_image(FakeUpload(data))
+
+        self.assertEqual([model for model, _ in FakeModel.calls], ['gemini-2.5-flash', 'gemini-other'])
+
+    def test_unreadable_entries_are_misses(self):
+        data = image_bytes()
+        AIDetectionService().analyze_image(FakeUpload(data))
+
+        for payload in (b'not json', b'{"probability": 5}', b'[1, 2]'):
+            for key in self.redis.store:
+                self.redis.store[key] = payload
+            result = AIDetectionService().analyze_image(FakeUpload(data))
+            self.assertEqual(result.probability, 70)
+
+        self.assertEqual(len(FakeModel.calls), 4)
+
+
+class UploadValidationTest(unittest.TestCase):
+    def setUp(self):
+        FakeModel.reset()
+        self.service = AIDetectionService()
+
+    def test_empty_upload_is_rejected(self):
+        with self.assertRaises(InvalidImageException):
+            self.service.analyze_image(FakeUpload(b''))
+
+    def test_oversize_upload_is_rejected(self):
+        self.service.MAX_UPLOAD_BYTES = 1024
+
+        with self.assertRaises(InvalidImageException):
+            self.service.analyze_image(FakeUpload(image_bytes((800, 800), 'PNG', (1, 2, 3)) + os.urandom(2048)))
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(InvalidImageException):
+            self.service.analyze_image(FakeUpload(image_bytes(fmt='BMP'), 'image.bmp'))
+
+    def test_small_image_is_rejected_before_decoding(self):
+        data = image_bytes((300, 50))
+
+        with mock.patch.object(ImageData, 'load', side_effect=AssertionError("imagem decodificada")):
+            with self.assertRaises(AnalysisFailedException):
+                self.service.analyze_image(FakeUpload(data), AIDetectionService.ANALYSIS_DETAILED)
+
+        self.assertEqual(FakeModel.calls, [])
+
+    def test_stream_without_seekable_is_accepted(self):
+        class LegacySpooledFile:
+            def __init__(self, data):
+                self.__buffer = BytesIO(data)
+
+            def read(self, *args):
+                return self.__buffer.read(*args)
+
+            def seek(self, *args):
+                return self.__buffer.seek(*args)
+
+            def tell(self):
+                return self.__buffer.tell()
+
+        upload = FakeUpload(b'')
+        upload.stream = LegacySpooledFile(image_bytes())
+
+        self.assertEqual(self.service.analyze_image(upload).probability, 70)
+
+    def test_unseekable_stream_is_buffered(self):
+        class PipeStream:
+            def __init__(self, data):
+                self.__buffer = BytesIO(data)
+
+            def read(self, *args):
+                return self.__buffer.read(*args)
+
+            def seekable(self):
+                return False
+
+        upload = FakeUpload(b'')
+        upload.stream = PipeStream(image_bytes())
+
+        self.assertEqual(self.service.analyze_image(upload).probability, 70)
+
+    def test_batch_size_is_capped(self):
+        uploads = [FakeUpload(image_bytes()) for _ in range(AIDetectionService.MAX_BATCH_SIZE + 1)]
+
+        with self.assertRaises(BatchTooLargeException):
+            self.service.analyze_batch(uploads)
+
+        self.assertEqual(FakeModel.calls, [])
+
+    def test_batch_reports_errors_per_item(self):
+        outcomes = self.service.analyze_batch([FakeUpload(image_bytes()), FakeUpload(b'')])
+
+        self.assertEqual(outcomes[0].probability, 70)
+        self.assertIsInstance(outcomes[1], InvalidImageException)
+
+
+class ResponseParsingTest(unittest.TestCase):
+    def setUp(self):
+        self.service = AIDetectionService()
+
+    def analyze(self, response_text: str):
+        FakeModel.reset(response_text)
+        return self.service.analyze_image(FakeUpload(image_bytes(color=(len(response_text) % 256, 0, 0))))
+
+    def test_json_response(self):
+        result = self.analyze(json.dumps({'probability': 85, 'analysis': 'SynthID'}))
+
+        self.assertEqual((result.probability, result.analysis_text), (85, 'SynthID'))
+
+    def test_out_of_range_probability_is_clamped(self):
+        self.assertEqual(self.analyze(json.dumps({'probability': 150, 'analysis': 'x'})).probability, 100)
+
+    def test_non_finite_probability_falls_back_to_text(self):
+        result = self.analyze('{"probability": Infinity, "analysis": "nota 30"}')
+
+        self.assertEqual(result.probability, 30)
+
+    def test_plain_text_falls_back_to_first_number(self):
+        self.assertEqual(self.analyze("Probabilidade: 42").probability, 42)
+
+
+if __name__ == '__main__':
+    unittest.main()